@@ -2,6 +2,7 @@
 from typing import List, Optional, Union
 import statistics as sts
 import logging
+import time
 
 from .const import (
     DEFAULT_TEMP_RANGE_MIN,
@@ -9,6 +10,7 @@ from .const import (
     CONF_HMIN,
     CONF_HMAX,
 )
+from .link import LinkTracker
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,6 +35,7 @@ class BLE_HT_data:
     _log_spikes: bool
     _min_temp: float
     _max_temp: float
+    _link: LinkTracker
 
     def __init__(self, mac: str, description: Optional[str]) -> None:
         """Init."""
@@ -41,6 +44,7 @@ class BLE_HT_data:
         self._log_spikes = False
         self._min_temp = DEFAULT_TEMP_RANGE_MIN
         self._max_temp = DEFAULT_TEMP_RANGE_MAX
+        self._link = LinkTracker(time.monotonic())
         self.reset()
 
     @property
@@ -55,6 +59,11 @@ class BLE_HT_data:
             return None
         return self._packet_data[-1].packet
 
+    @property
+    def link(self) -> LinkTracker:
+        """Return link quality tracker, kept across resets."""
+        return self._link
+
     @property
     def mac(self) -> str:
         """Return MAC address."""
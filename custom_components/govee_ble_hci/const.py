@@ -6,28 +6,80 @@ DOMAIN = "govee_ble_hci"
 CONF_DECIMALS = "decimals"
 CONF_DEVICE_MAC = "mac"
 CONF_DEVICE_NAME = "name"
+CONF_DISCOVERY = "discovery"
+CONF_DISCOVERY_ALLOW = "discovery_allow"
+CONF_DISCOVERY_DENY = "discovery_deny"
+CONF_DISCOVERY_MAX_NEW = "discovery_max_new"
+CONF_DISCOVERY_MIN_SIGHTINGS = "discovery_min_sightings"
+CONF_DISCOVERY_TABLE_SIZE = "discovery_table_size"
+CONF_EXPORT_BATCH_SIZE = "export_batch_size"
+CONF_EXPORT_FLUSH_INTERVAL = "export_flush_interval"
+CONF_EXPORT_FORMAT = "export_format"
+CONF_EXPORT_QUEUE_SIZE = "export_queue_size"
+CONF_EXPORT_TARGET = "export_target"
 CONF_GOVEE_DEVICES = "govee_devices"
 CONF_HCI_DEVICE = "hci_device"
+CONF_HISTORY = "history"
+CONF_HISTORY_PATH = "history_path"
 CONF_LOG_SPIKES = "log_spikes"
+CONF_PARSE_QUEUE_OVERFLOW = "parse_queue_overflow"
+CONF_PARSE_QUEUE_SIZE = "parse_queue_size"
+CONF_PARSE_WORKER = "parse_worker"
 CONF_PERIOD = "period"
 CONF_ROUNDING = "rounding"
 CONF_TEMP_RANGE_MAX_CELSIUS = "temp_range_max_celsius"
 CONF_TEMP_RANGE_MIN_CELSIUS = "temp_range_min_celsius"
+CONF_TRACE = "trace"
+CONF_TRACE_MACS = "trace_macs"
+CONF_TRACE_SAMPLE = "trace_sample"
+CONF_TRACE_SIZE = "trace_size"
 CONF_USE_MEDIAN = "use_median"
 
 
 # Default values for configuration options
 DEFAULT_DECIMALS = 2
+DEFAULT_DISCOVERY = False
+DEFAULT_DISCOVERY_MAX_NEW = 5
+DEFAULT_DISCOVERY_MIN_SIGHTINGS = 5
+DEFAULT_DISCOVERY_TABLE_SIZE = 1024
+DEFAULT_EXPORT_BATCH_SIZE = 500
+DEFAULT_EXPORT_FLUSH_INTERVAL = 10
+DEFAULT_EXPORT_FORMAT = "influx"
+DEFAULT_EXPORT_QUEUE_SIZE = 10000
 DEFAULT_HCI_DEVICE = "hci0"
+DEFAULT_HISTORY = False
+DEFAULT_HISTORY_PATH = "govee_ble_hci_history"
 DEFAULT_LOG_SPIKES = False
+DEFAULT_PARSE_QUEUE_OVERFLOW = "drop_oldest"
+DEFAULT_PARSE_QUEUE_SIZE = 1024
+DEFAULT_PARSE_WORKER = False
 DEFAULT_PERIOD = 60
 DEFAULT_ROUNDING = True
 DEFAULT_TEMP_RANGE_MAX = 60.0
 DEFAULT_TEMP_RANGE_MIN = -20.0
+DEFAULT_TRACE = False
+DEFAULT_TRACE_SAMPLE = 1
+DEFAULT_TRACE_SIZE = 1000
 DEFAULT_USE_MEDIAN = False
 
 """Fixed constants."""
 
+# History query service
+SERVICE_HISTORY_QUERY = "history_query"
+EVENT_HISTORY = "govee_ble_hci_history"
+
+# Parse worker statistics service
+SERVICE_PARSE_STATS = "parse_stats"
+EVENT_PARSE_STATS = "govee_ble_hci_parse_stats"
+
+# Packet tracing services
+SERVICE_TRACE_DUMP = "trace_dump"
+SERVICE_TRACE_START = "trace_start"
+SERVICE_TRACE_STOP = "trace_stop"
+EVENT_TRACE = "govee_ble_hci_trace"
+TRACE_DUMP_FILE = "govee_ble_hci_trace.json"
+TRACE_SIZE_MAX = 100000
+
 # Sensor measurement limits to exclude erroneous spikes from the results
 CONF_HMIN = 0.0
 CONF_HMAX = 99.9
@@ -0,0 +1,153 @@
+"""Discovery of unconfigured Govee devices."""
+from collections import OrderedDict, deque
+from typing import Any, Collection, Deque, Dict, List, Optional, Set, Tuple
+import logging
+
+from .govee_advertisement import (
+    GoveeAdvertisement,
+    address_from_mac,
+    is_govee_name,
+    reverse_mac,
+)
+
+###############################################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+# Re-parse devices not recognized as Govee every N frames, their first frames
+# may have been scan responses without manufacturer data or name
+FOREIGN_RECHECK_INTERVAL = 64
+
+
+class DiscoveredDevice:
+    """Sighting record of a Govee candidate."""
+
+    __slots__ = ("sightings", "model", "name")
+
+    sightings: int
+    model: Optional[str]
+    name: Optional[str]
+
+    def __init__(self) -> None:
+        """Init."""
+        self.sightings = 0
+        self.model = None
+        self.name = None
+
+
+class DiscoveryTracker:
+    """Size-capped LRU tables of unconfigured devices.
+
+    ``seen`` runs on the frame handling path for every frame of an unknown
+    address. Only addresses sending a Govee company ID or name become
+    candidates; all others go to a separate negative cache, where they cost
+    a dict lookup and are re-parsed every FOREIGN_RECHECK_INTERVAL frames.
+    A flood of foreign devices can therefore not evict a candidate.
+    Promoted devices leave the candidates for a set that is never evicted,
+    so they are only ever queued once.
+    """
+
+    _candidates: "OrderedDict[bytes, DiscoveredDevice]"
+    _foreign: "OrderedDict[bytes, int]"
+    _capacity: int
+    _min_sightings: int
+    _allow: Optional[frozenset]
+    _deny: frozenset
+    _promoted: Set[bytes]
+    _ready: Deque[Tuple[str, Optional[str], str]]
+
+    def __init__(
+        self,
+        capacity: int,
+        min_sightings: int,
+        allow: Optional[Collection[str]] = None,
+        deny: Collection[str] = (),
+    ) -> None:
+        """Init."""
+        self._candidates = OrderedDict()
+        self._foreign = OrderedDict()
+        self._capacity = max(capacity, 1)
+        self._min_sightings = max(min_sightings, 1)
+        self._allow = (
+            frozenset(address_from_mac(mac) for mac in allow)
+            if allow is not None
+            else None
+        )
+        self._deny = frozenset(address_from_mac(mac) for mac in deny)
+        self._promoted = set()
+        self._ready = deque()
+
+    def __len__(self) -> int:
+        """Number of tracked Govee candidates."""
+        return len(self._candidates)
+
+    @property
+    def pending(self) -> int:
+        """Number of devices waiting for entity creation."""
+        return len(self._ready)
+
+    def seen(self, address: bytes, data: bytes) -> None:
+        """Record a frame of an unconfigured address."""
+        if address in self._deny or address in self._promoted:
+            return
+        if self._allow is not None and address not in self._allow:
+            return
+
+        entry = self._candidates.get(address)
+        if entry is None:
+            frames = self._foreign.get(address)
+            if frames is not None:
+                self._foreign[address] = frames + 1
+                self._foreign.move_to_end(address)
+                if (frames + 1) % FOREIGN_RECHECK_INTERVAL:
+                    return
+        else:
+            self._candidates.move_to_end(address)
+
+        ga = GoveeAdvertisement(data)
+        if entry is None:
+            # Other vendors' frames may match a Govee layout by length alone
+            if not (ga.check_is_govee() or is_govee_name(ga.name)):
+                if frames is None:
+                    _insert(self._foreign, address, 1, self._capacity)
+                return
+            self._foreign.pop(address, None)
+            entry = DiscoveredDevice()
+            _insert(self._candidates, address, entry, self._capacity)
+
+        if ga.name is not None:
+            entry.name = ga.name
+        if ga.model is None or ga.packet is None:
+            return
+
+        entry.model = ga.model
+        entry.sightings += 1
+        if entry.sightings >= self._min_sightings:
+            del self._candidates[address]
+            self._promoted.add(address)
+            self._ready.append((reverse_mac(address), entry.name, entry.model))
+
+    def pop_ready(self, limit: int) -> List[Tuple[str, Optional[str], str]]:
+        """Return up to limit (mac, name, model) tuples of devices to create."""
+        ready = []
+        while self._ready and len(ready) < limit:
+            ready.append(self._ready.popleft())
+        return ready
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return table occupancy."""
+        return {
+            "candidates": len(self._candidates),
+            "foreign": len(self._foreign),
+            "pending": len(self._ready),
+        }
+
+
+def _insert(
+    table: "OrderedDict[bytes, Any]", key: bytes, value: Any, size: int
+) -> None:
+    """Add a key to an LRU table, evicting the least recently used one."""
+    table[key] = value
+    if len(table) > size:
+        table.popitem(last=False)
@@ -0,0 +1,306 @@
+"""Bulk export of device aggregates as line protocol or CSV."""
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import csv
+import io
+import logging
+import os
+import socket
+import threading
+
+###############################################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("influx", "csv")
+EXPORT_SCHEMES = ("file", "udp", "unix", "unixgram")
+
+CSV_HEADER = "timestamp,mac,name,temperature,humidity,battery,rssi,samples"
+MEASUREMENT = "govee"
+
+# Keep datagrams below a typical Ethernet MTU
+UDP_MAX_PAYLOAD = 1400
+SOCKET_TIMEOUT = 5.0
+
+
+class PartialSendError(OSError):
+    """Sending failed after the first lines of a batch went out."""
+
+    sent: int
+
+    def __init__(self, sent: int, error: OSError) -> None:
+        """Init."""
+        super().__init__(error.errno, error.strerror)
+        self.sent = sent
+
+
+def parse_target(target: str) -> Tuple[str, Any]:
+    """Split an export target URL into scheme and address."""
+    parts = urlsplit(target)
+    if parts.scheme not in EXPORT_SCHEMES:
+        raise ValueError("Unsupported export target: {}".format(target))
+    if parts.scheme == "udp":
+        if not parts.hostname or not parts.port:
+            raise ValueError("UDP export target needs host and port: " + target)
+        return parts.scheme, (parts.hostname, parts.port)
+    if not parts.path:
+        raise ValueError("Export target needs a path: {}".format(target))
+    return parts.scheme, parts.path
+
+
+def _escape_tag(value: str) -> str:
+    """Escape a line protocol tag value."""
+    return value.replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+def format_influx(
+    mac: str,
+    name: Optional[str],
+    timestamp: float,
+    fields: Dict[str, Any],
+) -> Optional[str]:
+    """Format an aggregate as an InfluxDB line protocol line."""
+    values = []
+    for key, value in fields.items():
+        if value is None:
+            continue
+        if isinstance(value, int):
+            values.append("{}={}i".format(key, value))
+        else:
+            values.append("{}={}".format(key, float(value)))
+    if not values:
+        return None
+
+    tags = "mac=" + _escape_tag(mac)
+    if name:
+        tags += ",name=" + _escape_tag(name)
+    return "{},{} {} {}".format(
+        MEASUREMENT, tags, ",".join(values), int(timestamp * 1000) * 1000000
+    )
+
+
+def format_csv(
+    mac: str,
+    name: Optional[str],
+    timestamp: float,
+    fields: Dict[str, Any],
+) -> Optional[str]:
+    """Format an aggregate as a CSV row matching CSV_HEADER."""
+    row = io.StringIO()
+    csv.writer(row, lineterminator="").writerow(
+        [
+            int(timestamp),
+            mac,
+            name or "",
+            fields.get("temperature", ""),
+            fields.get("humidity", ""),
+            fields.get("battery", ""),
+            fields.get("rssi", ""),
+            fields.get("samples", ""),
+        ]
+    )
+    return row.getvalue()
+
+
+class ExportSink:
+    """Bounded buffer of formatted aggregates flushed in batches."""
+
+    _scheme: str
+    _address: Any
+    _format: str
+    _batch_size: int
+    _queue: Deque[str]
+    _queue_size: int
+    _socket: Optional[socket.socket]
+    _lock: threading.Lock
+    _flush_lock: threading.Lock
+    _stats: Dict[str, int]
+    _reported_drops: int
+
+    def __init__(
+        self,
+        target: str,
+        export_format: str,
+        batch_size: int,
+        queue_size: int,
+    ) -> None:
+        """Init."""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError("Unsupported export format: {}".format(export_format))
+        self._scheme, self._address = parse_target(target)
+        self._format = export_format
+        self._batch_size = max(batch_size, 1)
+        self._queue = deque()
+        self._queue_size = max(queue_size, self._batch_size)
+        self._socket = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stats = {
+            "queued": 0,
+            "sent": 0,
+            "batches": 0,
+            "dropped": 0,
+            "errors": 0,
+        }
+        self._reported_drops = 0
+
+    @property
+    def backlog(self) -> int:
+        """Number of lines waiting to be sent."""
+        return len(self._queue)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return a copy of the export counters."""
+        stats = dict(self._stats)
+        stats["backlog"] = len(self._queue)
+        return stats
+
+    def add(
+        self,
+        mac: str,
+        name: Optional[str],
+        timestamp: float,
+        temperature: Optional[float] = None,
+        humidity: Optional[float] = None,
+        battery: Optional[int] = None,
+        rssi: Optional[int] = None,
+        samples: Optional[int] = None,
+    ) -> None:
+        """Buffer the aggregate of a device, dropping it if the queue is full."""
+        fields = {
+            "temperature": temperature,
+            "humidity": humidity,
+            "battery": battery,
+            "rssi": rssi,
+            "samples": samples,
+        }
+        formatter = format_influx if self._format == "influx" else format_csv
+        line = formatter(mac, name, timestamp, fields)
+        if line is None:
+            return
+
+        with self._lock:
+            if len(self._queue) >= self._queue_size:
+                self._stats["dropped"] += 1
+                return
+            self._queue.append(line)
+            self._stats["queued"] += 1
+
+    def flush(self, force: bool = False) -> None:
+        """Send full batches, or everything when forced."""
+        with self._flush_lock:
+            self._flush(force)
+
+    def _flush(self, force: bool) -> None:
+        """Send batches, callers hold the flush lock."""
+        while True:
+            with self._lock:
+                if not self._queue or (not force and len(self._queue) < self._batch_size):
+                    break
+                count = min(len(self._queue), self._batch_size)
+                batch = [self._queue.popleft() for _ in range(count)]
+
+            try:
+                self._send(batch)
+            except OSError as error:
+                sent = error.sent if isinstance(error, PartialSendError) else 0
+                self._close_socket()
+                self._stats["sent"] += sent
+                self._stats["errors"] += 1
+                _LOGGER.warning("Error exporting to %s: %s", self._address, error)
+                self._requeue(batch[sent:])
+                break
+
+            self._stats["sent"] += len(batch)
+            self._stats["batches"] += 1
+
+        if self._stats["dropped"] != self._reported_drops:
+            self._reported_drops = self._stats["dropped"]
+            _LOGGER.warning(
+                "Export queue full, %d aggregates dropped so far",
+                self._reported_drops,
+            )
+
+    def close(self, *args: Any) -> None:
+        """Send everything still buffered and release the transport."""
+        self.flush(force=True)
+        self._close_socket()
+
+    def _requeue(self, batch: List[str]) -> None:
+        """Put a failed batch back in front of the queue as far as it fits."""
+        with self._lock:
+            room = self._queue_size - len(self._queue)
+            kept = batch[:room] if room > 0 else []
+            self._queue.extendleft(reversed(kept))
+            self._stats["dropped"] += len(batch) - len(kept)
+
+    def _send(self, batch: List[str]) -> None:
+        """Write a batch of lines to the transport."""
+        if self._scheme == "file":
+            self._write_file(batch)
+        elif self._scheme == "unix":
+            sock = self._connect(socket.SOCK_STREAM)
+            sock.sendall(("\n".join(batch) + "\n").encode())
+        else:
+            family = socket.AF_INET if self._scheme == "udp" else socket.AF_UNIX
+            sock = self._connect(socket.SOCK_DGRAM, family)
+            sent = 0
+            for payload, lines in self._datagrams(batch):
+                try:
+                    sock.sendto(payload, self._address)
+                except OSError as error:
+                    if not sent:
+                        raise
+                    raise PartialSendError(sent, error) from error
+                sent += lines
+
+    def _write_file(self, batch: List[str]) -> None:
+        """Append a batch of lines to the export file."""
+        new_file = not os.path.exists(self._address)
+        with open(self._address, "a") as export_file:
+            if new_file and self._format == "csv":
+                export_file.write(CSV_HEADER + "\n")
+            export_file.write("\n".join(batch) + "\n")
+
+    def _connect(self, sock_type: int, family: int = socket.AF_UNIX) -> socket.socket:
+        """Return the open socket, creating it on first use."""
+        if self._socket is None:
+            sock = socket.socket(family, sock_type)
+            sock.settimeout(SOCKET_TIMEOUT)
+            if sock_type == socket.SOCK_STREAM:
+                try:
+                    sock.connect(self._address)
+                except OSError:
+                    sock.close()
+                    raise
+            self._socket = sock
+        return self._socket
+
+    def _close_socket(self) -> None:
+        """Close the socket so the next batch reconnects."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    @staticmethod
+    def _datagrams(batch: List[str]) -> List[Tuple[bytes, int]]:
+        """Pack whole lines into datagrams of at most UDP_MAX_PAYLOAD bytes.
+
+        Each datagram comes with the number of lines it holds.
+        """
+        datagrams = []
+        payload = b""
+        lines = 0
+        for line in batch:
+            data = line.encode() + b"\n"
+            if payload and len(payload) + len(data) > UDP_MAX_PAYLOAD:
+                datagrams.append((payload, lines))
+                payload = b""
+                lines = 0
+            payload += data
+            lines += 1
+        if payload:
+            datagrams.append((payload, lines))
+        return datagrams
@@ -17,6 +17,11 @@ from bleson.core.hci.type_converters import (  # type: ignore
 
 _LOGGER = logging.getLogger(__name__)
 
+# Manufacturer data IDs only sent by Govee devices, H5101/H5102 use the
+# generic 0x0100 and are recognized by their name
+GOVEE_COMPANY_IDS = ("88ec", "0188")
+GOVEE_NAME_PREFIXES = ("GVH", "Govee", "Ihoment", "Minger")
+
 
 def twos_complement(n: int, w: int = 16) -> int:
     """Two's complement integer conversion."""
@@ -46,6 +51,16 @@ def reverse_mac(rmac: bytes) -> Optional[str]:
     return (":".join(macarr)).upper()
 
 
+def is_govee_name(name: Optional[str]) -> bool:
+    """Check if an advertised device name is that of a Govee device."""
+    return name is not None and name.startswith(GOVEE_NAME_PREFIXES)
+
+
+def address_from_mac(mac: str) -> bytes:
+    """Change a MAC address string to Little Endian address bytes."""
+    return bytes(reversed(bytes.fromhex(mac.replace(":", ""))))
+
+
 class GoveeAdvertisement:
     """Govee thermometer/hygrometer BLE sensor advertisement parser class."""
 
@@ -75,28 +90,18 @@ class GoveeAdvertisement:
 
             pos = 10
             while pos < len(data) - 1:
-                _LOGGER.debug("POS={}".format(pos))
                 length = data[pos]
                 payload_offset = pos + 2
                 gap_type = data[pos + 1]
                 payload_end = payload_offset + length - 1
                 payload = data[payload_offset:payload_end]
-                _LOGGER.debug(
-                    "Pos={} Type=0x{:02x} Len={} Payload={}".format(
-                        pos, gap_type, length, hex_string(payload)
-                    )
-                )
                 if GAP_FLAGS == gap_type:
                     self.flags = payload[0]
-                    _LOGGER.debug("Flags={:02x}".format(self.flags))
                 elif GAP_NAME_COMPLETE == gap_type:
                     self.name = payload.decode("ascii")
-                    _LOGGER.debug("Complete Name={}".format(self.name))
                 elif GAP_MFG_DATA == gap_type:
                     # unit8
                     self.mfg_data = payload
-                    msg = "Manufacturer Data={}"
-                    _LOGGER.debug(msg.format(str(self.mfg_data)))
                 pos += length + 1
 
             if self.check_is_gvh5075_gvh5072():
@@ -132,6 +137,12 @@ class GoveeAdvertisement:
         except (ValueError, IndexError):
             pass
 
+    def check_is_govee(self) -> bool:
+        """Check if the company ID or device name is that of Govee."""
+        return any(
+            self._mfg_data_id_check(company_id) for company_id in GOVEE_COMPANY_IDS
+        ) or is_govee_name(self.name)
+
     def check_is_gvh5074(self) -> bool:
         """Check if mfg data is that of Govee H5074."""
         return self._mfg_data_check(9, 6)
@@ -0,0 +1,31 @@
+"""Bluetooth HCI access, imported on first use to keep startup fast."""
+from typing import Any, Callable
+
+from bleson import get_provider  # type: ignore
+from bleson.core.hci.constants import EVT_LE_ADVERTISING_REPORT  # type: ignore
+
+from .discovery import DiscoveryTracker
+from .govee_advertisement import GoveeAdvertisement, address_from_mac
+
+__all__ = [
+    "EVT_LE_ADVERTISING_REPORT",
+    "DiscoveryTracker",
+    "GoveeAdvertisement",
+    "address_from_mac",
+    "close_adapter",
+    "open_adapter",
+]
+
+
+def open_adapter(hci_device: str, handle_meta_event: Callable[[Any], None]) -> Any:
+    """Open a Bluetooth adapter and route its LE meta events to a handler."""
+    # XXX: will not work if there are more than 10 HCI devices
+    adapter = get_provider().get_adapter(int(hci_device[-1]))
+    adapter._handle_meta_event = handle_meta_event
+    return adapter
+
+
+def close_adapter(adapter: Any) -> None:
+    """Stop the reader thread of an adapter and close its socket."""
+    adapter._keep_running = False
+    adapter.close()
@@ -0,0 +1,288 @@
+"""Downsampled per-device history stored in fixed-size memory-mapped rings."""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+
+###############################################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+# (bucket width in seconds, number of buckets kept)
+#   1 min for 24 hours, 15 min for 7 days, 1 hour for 90 days
+HISTORY_RESOLUTIONS: Tuple[Tuple[int, int], ...] = (
+    (60, 1440),
+    (900, 672),
+    (3600, 2160),
+)
+
+# File header: magic, format version, reserved, bucket width, bucket count
+_HEADER = struct.Struct("<4sHHII")
+_MAGIC = b"GVHR"
+_VERSION = 1
+
+# Bucket record: bucket index, temperature count, humidity count,
+#   temperature min/mean/max, humidity min/mean/max
+_RECORD = struct.Struct("<IHHffffff")
+_COUNT_MAX = 0xFFFF
+
+# float32 holds about 7 significant digits, round values read back to this
+DEFAULT_HISTORY_DECIMALS = 4
+
+
+class HistoryRing:
+    """Fixed-size ring of min/mean/max buckets for one device and resolution.
+
+    A bucket lives at slot ``(timestamp // resolution) % slots``; the stored
+    bucket index tells whether a slot holds current data or a stale lap.
+    """
+
+    resolution: int
+    slots: int
+    _file: Any
+    _map: mmap.mmap
+
+    def __init__(self, path: str, resolution: int, slots: int) -> None:
+        """Open (or create) the ring file and map it into memory."""
+        self.resolution = resolution
+        self.slots = slots
+        size = _HEADER.size + slots * _RECORD.size
+
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        self._file = open(path, mode)
+        if os.fstat(self._file.fileno()).st_size != size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+        header = _HEADER.unpack_from(self._map, 0)
+        if header != (_MAGIC, _VERSION, 0, resolution, slots):
+            if header[0] == _MAGIC:
+                _LOGGER.warning("Resetting incompatible history file %s", path)
+            self._map[:] = bytes(size)
+            _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, 0, resolution, slots)
+
+    @property
+    def span(self) -> int:
+        """Number of seconds covered by the ring."""
+        return self.resolution * self.slots
+
+    def add(
+        self, timestamp: float, temperature: Optional[float], humidity: Optional[float]
+    ) -> None:
+        """Merge a reading into the bucket covering timestamp."""
+        index = int(timestamp // self.resolution)
+        offset = _HEADER.size + (index % self.slots) * _RECORD.size
+        record = _RECORD.unpack_from(self._map, offset)
+
+        if record[0] == index:
+            t_count, h_count = record[1], record[2]
+            t_min, t_mean, t_max, h_min, h_mean, h_max = record[3:]
+        else:
+            t_count = h_count = 0
+            t_min = t_mean = t_max = h_min = h_mean = h_max = math.nan
+
+        if temperature is not None:
+            t_count, t_min, t_mean, t_max = _merge(
+                t_count, t_min, t_mean, t_max, temperature
+            )
+        if humidity is not None:
+            h_count, h_min, h_mean, h_max = _merge(
+                h_count, h_min, h_mean, h_max, humidity
+            )
+
+        _RECORD.pack_into(
+            self._map,
+            offset,
+            index,
+            t_count,
+            h_count,
+            t_min,
+            t_mean,
+            t_max,
+            h_min,
+            h_mean,
+            h_max,
+        )
+
+    def buckets(
+        self, start: float, end: float, decimals: int = DEFAULT_HISTORY_DECIMALS
+    ) -> List[Dict[str, Any]]:
+        """Return populated buckets between start and end, oldest first."""
+        last = int(end // self.resolution)
+        first = max(int(start // self.resolution), last - self.slots + 1)
+        found = []
+        for index in range(first, last + 1):
+            offset = _HEADER.size + (index % self.slots) * _RECORD.size
+            record = _RECORD.unpack_from(self._map, offset)
+            # Zeroed slots of a new file would otherwise match bucket 0
+            if record[0] != index or not (record[1] or record[2]):
+                continue
+            found.append(
+                {
+                    "start": index * self.resolution,
+                    "temperature_count": record[1],
+                    "humidity_count": record[2],
+                    "temperature_min": _value(record[1], record[3], decimals),
+                    "temperature_mean": _value(record[1], record[4], decimals),
+                    "temperature_max": _value(record[1], record[5], decimals),
+                    "humidity_min": _value(record[2], record[6], decimals),
+                    "humidity_mean": _value(record[2], record[7], decimals),
+                    "humidity_max": _value(record[2], record[8], decimals),
+                }
+            )
+        return found
+
+    def flush(self) -> None:
+        """Write dirty pages back to disk."""
+        self._map.flush()
+
+    def close(self) -> None:
+        """Flush and unmap the ring file."""
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+class HistoryStore:
+    """Per-device history rings at every configured resolution."""
+
+    _path: str
+    _decimals: int
+    _rings: Dict[str, List[HistoryRing]]
+    _lock: threading.Lock
+
+    def __init__(self, path: str, decimals: int = DEFAULT_HISTORY_DECIMALS) -> None:
+        """Init."""
+        self._path = path
+        self._decimals = decimals
+        self._rings = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def path(self) -> str:
+        """Return directory holding the ring files."""
+        return self._path
+
+    def record(
+        self,
+        mac: str,
+        timestamp: float,
+        temperature: Optional[float],
+        humidity: Optional[float],
+    ) -> None:
+        """Add a reading to every resolution of a device."""
+        if temperature is None and humidity is None:
+            return
+        with self._lock:
+            for ring in self._device_rings(mac):
+                ring.add(timestamp, temperature, humidity)
+
+    def query(
+        self, mac: str, start: float, end: float, resolution: Optional[int] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return the resolution used and the buckets between start and end.
+
+        Without an explicit resolution the finest ring covering the whole
+        window is used, falling back to the coarsest one.
+        """
+        with self._lock:
+            rings = self._device_rings(mac)
+            ring = rings[-1]
+            for candidate in rings:
+                if resolution is None and candidate.span >= end - start:
+                    ring = candidate
+                    break
+                if candidate.resolution == resolution:
+                    ring = candidate
+                    break
+            return ring.resolution, ring.buckets(start, end, self._decimals)
+
+    def summary(
+        self, mac: str, start: float, end: float, resolution: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Return min/mean/max over a window."""
+        used, buckets = self.query(mac, start, end, resolution)
+        result: Dict[str, Any] = {"resolution": used, "bucket_count": len(buckets)}
+        for attr in ("temperature", "humidity"):
+            count = 0
+            total = 0.0
+            low = high = None
+            for bucket in buckets:
+                n = bucket[attr + "_count"]
+                if n == 0:
+                    continue
+                count += n
+                total += bucket[attr + "_mean"] * n
+                low = _lesser(low, bucket[attr + "_min"])
+                high = _greater(high, bucket[attr + "_max"])
+            result[attr + "_min"] = low
+            result[attr + "_mean"] = (
+                round(total / count, self._decimals) if count else None
+            )
+            result[attr + "_max"] = high
+        return result
+
+    def flush(self) -> None:
+        """Write all rings back to disk."""
+        with self._lock:
+            for rings in self._rings.values():
+                for ring in rings:
+                    ring.flush()
+
+    def close(self, *args: Any) -> None:
+        """Flush and close all rings."""
+        with self._lock:
+            for rings in self._rings.values():
+                for ring in rings:
+                    ring.close()
+            self._rings = {}
+
+    def _device_rings(self, mac: str) -> List[HistoryRing]:
+        """Return (opening on first use) the rings of a device."""
+        name = mac.replace(":", "").upper()
+        rings = self._rings.get(name)
+        if rings is None:
+            rings = [
+                HistoryRing(
+                    os.path.join(self._path, "{}_{}.ring".format(name, res)),
+                    res,
+                    slots,
+                )
+                for res, slots in HISTORY_RESOLUTIONS
+            ]
+            self._rings[name] = rings
+        return rings
+
+
+def _merge(
+    count: int, low: float, mean: float, high: float, value: float
+) -> Tuple[int, float, float, float]:
+    """Merge a value into a count/min/mean/max aggregate."""
+    if count == 0:
+        return 1, value, value, value
+    if count < _COUNT_MAX:
+        count += 1
+    return count, min(low, value), mean + (value - mean) / count, max(high, value)
+
+
+def _value(count: int, value: float, decimals: int) -> Optional[float]:
+    """Return a stored float rounded, or None for an empty aggregate."""
+    return round(value, decimals) if count else None
+
+
+def _lesser(current: Optional[float], value: Optional[float]) -> Optional[float]:
+    """Return the smaller of two optional values."""
+    if current is None or (value is not None and value < current):
+        return value
+    return current
+
+
+def _greater(current: Optional[float], value: Optional[float]) -> Optional[float]:
+    """Return the larger of two optional values."""
+    if current is None or (value is not None and value > current):
+        return value
+    return current
@@ -0,0 +1,130 @@
+"""Bluetooth LE link quality estimation."""
+from collections import deque
+from typing import Deque, Dict, Optional
+
+###############################################################################
+
+RSSI_ALPHA = 0.2
+INTERVAL_ALPHA = 0.1
+
+# Number of recent gaps the advertisement interval is taken from
+INTERVAL_WINDOW = 8
+
+# Shorter gaps are repeated reports of one advertisement, such as the scan
+# response following it, not an interval
+MIN_INTERVAL = 0.1
+
+# Advertisement intervals learned per model, shared by all devices
+_model_intervals: Dict[str, float] = {}
+
+
+class LinkTracker:
+    """Constant-size link statistics of one device.
+
+    The advertisement interval is the shortest of the last INTERVAL_WINDOW
+    gaps between frames: gaps spanning lost frames are longer and do not
+    skew it, and a too short estimate ages out of the window. Frames less
+    than MIN_INTERVAL after the last one are repeats and are neither timed
+    nor counted as received.
+    """
+
+    __slots__ = (
+        "_rssi",
+        "_gaps",
+        "_model",
+        "_last_frame",
+        "_window_start",
+        "_window_frames",
+    )
+
+    _rssi: Optional[float]
+    _gaps: Deque[float]
+    _model: Optional[str]
+    _last_frame: Optional[float]
+    _window_start: float
+    _window_frames: int
+
+    def __init__(self, now: float) -> None:
+        """Init."""
+        self._rssi = None
+        self._gaps = deque(maxlen=INTERVAL_WINDOW)
+        self._model = None
+        self._last_frame = None
+        self._window_start = now
+        self._window_frames = 0
+
+    @property
+    def rssi(self) -> Optional[float]:
+        """Exponentially weighted moving average of RSSI."""
+        return self._rssi
+
+    @property
+    def interval(self) -> Optional[float]:
+        """Learned advertisement interval in seconds."""
+        if self._gaps:
+            return min(self._gaps)
+        if self._model is not None:
+            return _model_intervals.get(self._model)
+        return None
+
+    def frame(self, now: float, rssi: Optional[int], model: Optional[str]) -> None:
+        """Account for a received frame."""
+        if rssi is not None:
+            if self._rssi is None:
+                self._rssi = float(rssi)
+            else:
+                self._rssi += RSSI_ALPHA * (rssi - self._rssi)
+
+        if model is not None:
+            self._model = model
+
+        if self._last_frame is not None:
+            gap = now - self._last_frame
+            if gap < MIN_INTERVAL:
+                return
+            self._gaps.append(gap)
+
+            if self._model is not None:
+                interval = min(self._gaps)
+                shared = _model_intervals.get(self._model, interval)
+                _model_intervals[self._model] = shared + INTERVAL_ALPHA * (
+                    interval - shared
+                )
+
+        self._last_frame = now
+        self._window_frames += 1
+
+    def since_last_frame(self, now: float) -> Optional[float]:
+        """Seconds since the last received frame."""
+        if self._last_frame is None:
+            return None
+        return now - self._last_frame
+
+    def reception_ratio(self, now: float) -> Optional[float]:
+        """Share of expected frames received since the window started."""
+        interval = self.interval
+        if not interval:
+            return None
+        expected = (now - self._window_start) / interval
+        if expected < 1:
+            return None
+        return min(self._window_frames / expected, 1.0)
+
+    def attributes(self, now: float) -> Dict[str, Optional[float]]:
+        """Return link statistics as state attributes."""
+        return {
+            "rssi ewma": _round(self._rssi, 1),
+            "advertisement interval": _round(self.interval, 2),
+            "packet reception ratio": _round(self.reception_ratio(now), 3),
+            "seconds since last frame": _round(self.since_last_frame(now), 1),
+        }
+
+    def reset_window(self, now: float) -> None:
+        """Start a new packet reception window."""
+        self._window_start = now
+        self._window_frames = 0
+
+
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    """Round an optional value."""
+    return None if value is None else round(value, digits)
@@ -1,20 +1,25 @@
 """Govee BLE monitor integration."""
 from datetime import timedelta
+import importlib
+import json
 import logging
+import os
+import re
+import time
 import voluptuous as vol
 from typing import Any, Collection, List, Optional, Dict, Sequence, Set, Tuple
 
-from bleson import get_provider  # type: ignore
-from bleson.core.hci.constants import EVT_LE_ADVERTISING_REPORT  # type: ignore
-from bleson.core.types import BDAddress  # type: ignore
-from bleson.core.hci.type_converters import hex_string  # type: ignore
-
 from homeassistant.exceptions import HomeAssistantError  # type: ignore
 from homeassistant.components.sensor import PLATFORM_SCHEMA  # type: ignore
 import homeassistant.helpers.config_validation as cv  # type: ignore
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.components.sensor import SensorEntity
-from homeassistant.helpers.event import track_point_in_utc_time  # type: ignore
+from homeassistant.helpers.event import (  # type: ignore
+    async_track_point_in_utc_time,
+    async_track_time_interval,
+    track_point_in_utc_time,
+)
 import homeassistant.util.dt as dt_util  # type: ignore
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -28,41 +33,113 @@ from homeassistant.const import (  # type: ignore
     TEMP_CELSIUS,
     PERCENTAGE,
     ATTR_BATTERY_LEVEL,
+    EVENT_HOMEASSISTANT_STOP,
 )
 
 from .const import (
     CONF_DECIMALS,
     CONF_DEVICE_MAC,
     CONF_DEVICE_NAME,
+    CONF_DISCOVERY,
+    CONF_DISCOVERY_ALLOW,
+    CONF_DISCOVERY_DENY,
+    CONF_DISCOVERY_MAX_NEW,
+    CONF_DISCOVERY_MIN_SIGHTINGS,
+    CONF_DISCOVERY_TABLE_SIZE,
+    CONF_EXPORT_BATCH_SIZE,
+    CONF_EXPORT_FLUSH_INTERVAL,
+    CONF_EXPORT_FORMAT,
+    CONF_EXPORT_QUEUE_SIZE,
+    CONF_EXPORT_TARGET,
     CONF_GOVEE_DEVICES,
     CONF_HCI_DEVICE,
+    CONF_HISTORY,
+    CONF_HISTORY_PATH,
     CONF_LOG_SPIKES,
+    CONF_PARSE_QUEUE_OVERFLOW,
+    CONF_PARSE_QUEUE_SIZE,
+    CONF_PARSE_WORKER,
     CONF_PERIOD,
     CONF_ROUNDING,
     CONF_TEMP_RANGE_MAX_CELSIUS,
     CONF_TEMP_RANGE_MIN_CELSIUS,
+    CONF_TRACE,
+    CONF_TRACE_MACS,
+    CONF_TRACE_SAMPLE,
+    CONF_TRACE_SIZE,
     CONF_USE_MEDIAN,
     DEFAULT_DECIMALS,
+    DEFAULT_DISCOVERY,
+    DEFAULT_DISCOVERY_MAX_NEW,
+    DEFAULT_DISCOVERY_MIN_SIGHTINGS,
+    DEFAULT_DISCOVERY_TABLE_SIZE,
+    DEFAULT_EXPORT_BATCH_SIZE,
+    DEFAULT_EXPORT_FLUSH_INTERVAL,
+    DEFAULT_EXPORT_FORMAT,
+    DEFAULT_EXPORT_QUEUE_SIZE,
     DEFAULT_HCI_DEVICE,
+    DEFAULT_HISTORY,
+    DEFAULT_HISTORY_PATH,
     DEFAULT_LOG_SPIKES,
+    DEFAULT_PARSE_QUEUE_OVERFLOW,
+    DEFAULT_PARSE_QUEUE_SIZE,
+    DEFAULT_PARSE_WORKER,
     DEFAULT_PERIOD,
     DEFAULT_ROUNDING,
     DEFAULT_TEMP_RANGE_MAX,
     DEFAULT_TEMP_RANGE_MIN,
+    DEFAULT_TRACE,
+    DEFAULT_TRACE_SAMPLE,
+    DEFAULT_TRACE_SIZE,
     DEFAULT_USE_MEDIAN,
     DOMAIN,
+    EVENT_HISTORY,
+    EVENT_PARSE_STATS,
+    EVENT_TRACE,
+    SERVICE_HISTORY_QUERY,
+    SERVICE_PARSE_STATS,
+    SERVICE_TRACE_DUMP,
+    SERVICE_TRACE_START,
+    SERVICE_TRACE_STOP,
+    TRACE_DUMP_FILE,
+    TRACE_SIZE_MAX,
 )
 
-from .govee_advertisement import GoveeAdvertisement
 from .ble_ht import BLE_HT_data
+from .history import DEFAULT_HISTORY_DECIMALS, HISTORY_RESOLUTIONS, HistoryStore
+from .export import EXPORT_FORMATS, ExportSink, parse_target
+from .worker import OVERFLOW_POLICIES, FrameQueue, ParseWorker
+from .trace import PacketTracer
 
 ###############################################################################
 
 _LOGGER = logging.getLogger(__name__)
 
+
+def export_target(value: Any) -> str:
+    """Validate an export target URL."""
+    value = cv.string(value)
+    try:
+        parse_target(value)
+    except ValueError as error:
+        raise vol.Invalid(str(error)) from error
+    return value
+
+
+MAC_ADDRESS_PATTERN = re.compile(r"[0-9A-Fa-f]{2}(:[0-9A-Fa-f]{2}){5}|[0-9A-Fa-f]{12}")
+
+
+def mac_address(value: Any) -> str:
+    """Validate a MAC address, keeping it as written for entity IDs."""
+    value = cv.string(value)
+    if not MAC_ADDRESS_PATTERN.fullmatch(value):
+        raise vol.Invalid("Invalid MAC address: {}".format(value))
+    return value
+
+
 DEVICES_SCHEMA = vol.Schema(
     {
-        vol.Optional(CONF_DEVICE_MAC): cv.string,
+        vol.Optional(CONF_DEVICE_MAC): mac_address,
         vol.Optional(CONF_DEVICE_NAME): cv.string,
     }
 )
@@ -82,91 +159,290 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
         vol.Optional(
             CONF_TEMP_RANGE_MAX_CELSIUS, default=DEFAULT_TEMP_RANGE_MAX
         ): float,
+        vol.Optional(CONF_HISTORY, default=DEFAULT_HISTORY): cv.boolean,
+        vol.Optional(CONF_HISTORY_PATH, default=DEFAULT_HISTORY_PATH): cv.string,
+        vol.Optional(CONF_EXPORT_TARGET): export_target,
+        vol.Optional(CONF_EXPORT_FORMAT, default=DEFAULT_EXPORT_FORMAT): vol.In(
+            EXPORT_FORMATS
+        ),
+        vol.Optional(
+            CONF_EXPORT_BATCH_SIZE, default=DEFAULT_EXPORT_BATCH_SIZE
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_EXPORT_FLUSH_INTERVAL, default=DEFAULT_EXPORT_FLUSH_INTERVAL
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_EXPORT_QUEUE_SIZE, default=DEFAULT_EXPORT_QUEUE_SIZE
+        ): cv.positive_int,
+        vol.Optional(CONF_PARSE_WORKER, default=DEFAULT_PARSE_WORKER): cv.boolean,
+        vol.Optional(CONF_DISCOVERY, default=DEFAULT_DISCOVERY): cv.boolean,
+        vol.Optional(CONF_DISCOVERY_ALLOW): vol.All(cv.ensure_list, [mac_address]),
+        vol.Optional(CONF_DISCOVERY_DENY, default=[]): vol.All(
+            cv.ensure_list, [mac_address]
+        ),
+        vol.Optional(
+            CONF_DISCOVERY_TABLE_SIZE, default=DEFAULT_DISCOVERY_TABLE_SIZE
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_DISCOVERY_MIN_SIGHTINGS, default=DEFAULT_DISCOVERY_MIN_SIGHTINGS
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_DISCOVERY_MAX_NEW, default=DEFAULT_DISCOVERY_MAX_NEW
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_PARSE_QUEUE_SIZE, default=DEFAULT_PARSE_QUEUE_SIZE
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_PARSE_QUEUE_OVERFLOW, default=DEFAULT_PARSE_QUEUE_OVERFLOW
+        ): vol.In(OVERFLOW_POLICIES),
+        vol.Optional(CONF_TRACE, default=DEFAULT_TRACE): cv.boolean,
+        vol.Optional(CONF_TRACE_MACS, default=[]): vol.All(
+            cv.ensure_list, [mac_address]
+        ),
+        vol.Optional(CONF_TRACE_SAMPLE, default=DEFAULT_TRACE_SAMPLE): cv.positive_int,
+        vol.Optional(CONF_TRACE_SIZE, default=DEFAULT_TRACE_SIZE): vol.All(
+            cv.positive_int, vol.Range(max=TRACE_SIZE_MAX)
+        ),
+    }
+)
+
+HISTORY_QUERY_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_DEVICE_MAC): mac_address,
+        vol.Optional("hours", default=24): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional("resolution"): vol.All(
+            vol.Coerce(int), vol.In([res for res, _ in HISTORY_RESOLUTIONS])
+        ),
+        vol.Optional("buckets", default=False): cv.boolean,
+    }
+)
+
+TRACE_START_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_TRACE_MACS, default=[]): vol.All(
+            cv.ensure_list, [mac_address]
+        ),
+        vol.Optional(CONF_TRACE_SAMPLE, default=DEFAULT_TRACE_SAMPLE): cv.positive_int,
+        vol.Optional(CONF_TRACE_SIZE, default=DEFAULT_TRACE_SIZE): vol.All(
+            cv.positive_int, vol.Range(max=TRACE_SIZE_MAX)
+        ),
     }
 )
 
+TRACE_DUMP_SCHEMA = vol.Schema({vol.Optional("clear", default=False): cv.boolean})
+
 ###############################################################################
 
 #
 # Configure for Home Assistant
 #
-def setup_platform(hass, config, add_entities, discovery_info=None) -> None:
+async def async_setup_platform(
+    hass, config, async_add_entities, discovery_info=None
+) -> None:
     """Set up the sensor platform."""
     _LOGGER.debug("Starting Govee HCI Sensor")
+    timings: Dict[str, float] = {}  # Startup phase durations in seconds
+    started = time.perf_counter()
 
     govee_devices: List[BLE_HT_data] = []  # Data objects of configured devices
     sensors_by_mac = {}  # HomeAssistant sensors by MAC address
+    link_sensors_by_mac: Dict[str, "LinkQualitySensor"] = {}  # Diagnostics
+    devices_by_address: Dict[bytes, BLE_HT_data] = {}  # By raw HCI address
     adapter = None
+    hci: Any = None  # Bluetooth HCI module, imported on first use
+    history: Optional[HistoryStore] = None
+    exporter: Optional[ExportSink] = None
+    stop_export_timer: Any = None  # Cancels the export flush timer
+    frames: Optional[FrameQueue] = None
+    parse_worker: Optional[ParseWorker] = None
+    discovery: Any = None  # DiscoveryTracker when discovery is enabled
+    tracer: Optional[PacketTracer] = None  # Only set while tracing
+    last_tracer: Optional[PacketTracer] = None  # Kept for dumps after stop
 
     def handle_meta_event(hci_packet) -> None:
         """Handle recieved BLE data."""
         # If recieved BLE packet is of type ADVERTISING_REPORT
-        if hci_packet.subevent_code == EVT_LE_ADVERTISING_REPORT:
-            packet_mac = hci_packet.data[3:9]
-
-            for device in govee_devices:
-                # If recieved device data matches a configured govee device
-                if BDAddress(device.mac) == BDAddress(packet_mac):
-                    _LOGGER.debug(
-                        "Received packet data for {}: {}".format(
-                            BDAddress(device.mac), hex_string(hci_packet.data)
-                        )
-                    )
-                    # parse packet data
-                    ga = GoveeAdvertisement(hci_packet.data)
-
-                    # If mfg data information is defined, update values
-                    if ga.packet is not None:
-                        device.update(ga.temperature, ga.humidity, ga.packet)
-
-                    # Update RSSI and battery level
-                    device.rssi = ga.rssi
-                    device.battery = ga.battery
-
-    def init_configureed_devices() -> None:
-        """Initialize configured Govee devices."""
-        for conf_dev in config[CONF_GOVEE_DEVICES]:
-            # Initialize BLE HT data objects
-            mac: str = conf_dev["mac"]
-            given_name = conf_dev.get("name", None)
-
-            device = BLE_HT_data(mac, given_name)
-            device.log_spikes = config[CONF_LOG_SPIKES]
-            device.maximum_temperature = config[CONF_TEMP_RANGE_MAX_CELSIUS]
-            device.minimum_temperature = config[CONF_TEMP_RANGE_MIN_CELSIUS]
-
-            if config[CONF_ROUNDING]:
-                device.decimal_places = config[CONF_DECIMALS]
-            govee_devices.append(device)
-
-            # Initialize HA sensors
-            name = conf_dev.get("name", mac)
-
-            tempDescription = SensorEntityDescription(
-                key="temperature",
-                name=name,
-                native_unit_of_measurement=TEMP_CELSIUS,
-                device_class=SensorDeviceClass.TEMPERATURE,
-                state_class=SensorStateClass.MEASUREMENT,
+        if hci_packet.subevent_code == hci.EVT_LE_ADVERTISING_REPORT:
+            if frames is not None:
+                # Leave parsing to the worker, never block the reader thread
+                frames.put(bytes(hci_packet.data))
+            else:
+                handle_advertising_report(hci_packet.data)
+
+    def handle_advertising_report(data: bytes) -> None:
+        """Parse an advertising report and update the matching device."""
+        packet_address = bytes(data[3:9])
+
+        # If recieved device data matches a configured govee device
+        device = devices_by_address.get(packet_address)
+        if device is None:
+            if discovery is not None:
+                discovery.seen(packet_address, data)
+            if tracer is not None and tracer.wants(packet_address):
+                tracer.record(data, hci.GoveeAdvertisement(data), False)
+            return
+
+        # parse packet data
+        ga = hci.GoveeAdvertisement(data)
+        if tracer is not None and tracer.wants(packet_address):
+            tracer.record(data, ga, True)
+
+        # If mfg data information is defined, update values
+        if ga.packet is not None:
+            device.update(ga.temperature, ga.humidity, ga.packet)
+
+        # Update RSSI and battery level
+        device.rssi = ga.rssi
+        device.battery = ga.battery
+        device.link.frame(time.monotonic(), ga.rssi, ga.model)
+
+    def init_device(mac: str, given_name: Optional[str]) -> List[Any]:
+        """Initialize a Govee device, return its HA sensors."""
+        # Initialize BLE HT data objects
+        device = BLE_HT_data(mac, given_name)
+        device.log_spikes = config[CONF_LOG_SPIKES]
+        device.maximum_temperature = config[CONF_TEMP_RANGE_MAX_CELSIUS]
+        device.minimum_temperature = config[CONF_TEMP_RANGE_MIN_CELSIUS]
+
+        if config[CONF_ROUNDING]:
+            device.decimal_places = config[CONF_DECIMALS]
+
+        # Initialize HA sensors
+        name = given_name or mac
+
+        tempDescription = SensorEntityDescription(
+            key="temperature",
+            name=name,
+            native_unit_of_measurement=TEMP_CELSIUS,
+            device_class=SensorDeviceClass.TEMPERATURE,
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+
+        humDescription = SensorEntityDescription(
+            key="humidity",
+            name=name,
+            native_unit_of_measurement=PERCENTAGE,
+            device_class=SensorDeviceClass.HUMIDITY,
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        linkDescription = SensorEntityDescription(
+            key="link",
+            name=name,
+            native_unit_of_measurement=PERCENTAGE,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        )
+        temp_sensor = TemperatureSensor(mac, name, tempDescription)
+        hum_sensor = HumiditySensor(mac, name, humDescription)
+        link_sensor = LinkQualitySensor(mac, name, linkDescription)
+        sensors = [temp_sensor, hum_sensor]
+        sensors_by_mac[mac] = sensors
+        link_sensors_by_mac[mac] = link_sensor
+
+        # Sensors must exist before the device can be matched by frames
+        govee_devices.append(device)
+        devices_by_address[hci.address_from_mac(mac)] = device
+        return sensors + [link_sensor]
+
+    def init_configureed_devices() -> List[Any]:
+        """Initialize configured Govee devices, return all their HA sensors."""
+        sensors = []
+        for conf_dev in config.get(CONF_GOVEE_DEVICES, []):
+            sensors += init_device(conf_dev["mac"], conf_dev.get("name", None))
+        return sensors
+
+    def init_discovered_devices() -> None:
+        """Initialize devices discovered since the last update."""
+        ready = discovery.pop_ready(config[CONF_DISCOVERY_MAX_NEW])
+        for mac, name, model in ready:
+            if mac in sensors_by_mac:
+                continue
+            _LOGGER.info("Discovered %s %s", model, mac)
+            hass.add_job(async_add_entities, init_device(mac, name))
+        if discovery.pending:
+            _LOGGER.debug("%d discovered devices pending", discovery.pending)
+
+    def history_query(call) -> None:
+        """Fire an event with the downsampled history of a device.
+
+        Buckets are written to a JSON file next to the history files, only
+        its path goes out with the event.
+        """
+        device = devices_by_address.get(
+            hci.address_from_mac(call.data[CONF_DEVICE_MAC])
+        )
+        if device is None:
+            _LOGGER.warning(
+                "No history for unconfigured device %s", call.data[CONF_DEVICE_MAC]
             )
-  
-            humDescription= SensorEntityDescription(
-                key="humidity",
-                name=name,
-                native_unit_of_measurement=PERCENTAGE,
-                device_class=SensorDeviceClass.HUMIDITY,
-                state_class=SensorStateClass.MEASUREMENT,
+            return
+        mac = device.mac
+
+        end = time.time()
+        start = end - call.data["hours"] * 3600
+        resolution = call.data.get("resolution")
+
+        event_data: Dict[str, Any] = {CONF_DEVICE_MAC: mac}
+        event_data.update(history.summary(mac, start, end, resolution))
+        if call.data["buckets"]:
+            _, buckets = history.query(mac, start, end, event_data["resolution"])
+            path = os.path.join(
+                history.path, "{}_query.json".format(mac.replace(":", ""))
             )
-            temp_sensor = TemperatureSensor(mac, name,  tempDescription)
-            hum_sensor = HumiditySensor(mac, name,  humDescription)
-            sensors = [temp_sensor, hum_sensor]
-            sensors_by_mac[mac] = sensors
-            add_entities(sensors)
+            with open(path, "w") as buckets_file:
+                json.dump(buckets, buckets_file)
+            event_data["buckets_file"] = path
+        hass.bus.fire(EVENT_HISTORY, event_data)
+
+    def start_tracing(macs: List[str], sample: int, size: int) -> None:
+        """Replace the active tracer."""
+        nonlocal tracer, last_tracer
+        addresses = [hci.address_from_mac(mac) for mac in macs]
+        last_tracer = PacketTracer(size, addresses, sample)
+        tracer = last_tracer
+        _LOGGER.info(
+            "Tracing 1 in %d frames of %s", sample, ", ".join(macs) or "all devices"
+        )
+
+    def trace_start(call) -> None:
+        """Start tracing frames."""
+        start_tracing(
+            call.data[CONF_TRACE_MACS],
+            call.data[CONF_TRACE_SAMPLE],
+            call.data[CONF_TRACE_SIZE],
+        )
+
+    def trace_stop(call) -> None:
+        """Stop tracing frames, keeping the recorded entries."""
+        nonlocal tracer
+        tracer = None
+
+    def trace_dump(call) -> None:
+        """Fire an event with the number of recorded trace entries.
+
+        Entries are written to a JSON file in the config directory, only its
+        path goes out with the event.
+        """
+        entries = []
+        if last_tracer is not None:
+            entries = last_tracer.dump(call.data["clear"])
+        path = hass.config.path(TRACE_DUMP_FILE)
+        with open(path, "w") as trace_file:
+            json.dump(entries, trace_file)
+        hass.bus.fire(
+            EVENT_TRACE,
+            {"active": tracer is not None, "entries": len(entries), "file": path},
+        )
+
+    def parse_stats(call) -> None:
+        """Fire an event with the parse queue and worker counters."""
+        hass.bus.fire(EVENT_PARSE_STATS, parse_worker.stats)
 
     def update_ble_devices(config) -> None:
         """Discover Bluetooth LE devices."""
         # _LOGGER.debug("Discovering Bluetooth LE devices")
         use_median = config[CONF_USE_MEDIAN]
+        now = time.time()
 
         ATTR = "_device_state_attributes"
         textattr = "last median of" if use_median else "last mean of"
@@ -175,36 +451,63 @@ def setup_platform(hass, config, add_entities, discovery_info=None) -> None:
             sensors = sensors_by_mac[device.mac]
 
             _LOGGER.debug(
-                "Last mfg data for {}: {}".format(
-                    BDAddress(device.mac), device.last_packet
-                )
+                "Last mfg data for {}: {}".format(device.mac, device.last_packet)
             )
 
+            # Published every period, even without data, to show dropouts
+            link_now = time.monotonic()
+            link_sensor = link_sensors_by_mac[device.mac]
+            link_sensor.update_link(device.link.attributes(link_now))
+            link_sensor.async_schedule_update_ha_state()
+            device.link.reset_window(link_now)
+
             if device.last_packet:
+                humstate = None
+                tempstate = None
+
                 if device.median_humidity is not None:
                     humstate_med = float(device.median_humidity)
                     getattr(sensors[1], ATTR)["median"] = humstate_med
                     if use_median:
+                        humstate = humstate_med
                         setattr(sensors[1], "_state", humstate_med)
 
                 if device.mean_humidity is not None:
                     humstate_mean = float(device.mean_humidity)
                     getattr(sensors[1], ATTR)["mean"] = humstate_mean
                     if not use_median:
+                        humstate = humstate_mean
                         setattr(sensors[1], "_state", humstate_mean)
 
                 if device.median_temperature is not None:
                     tempstate_med = float(device.median_temperature)
                     getattr(sensors[0], ATTR)["median"] = tempstate_med
                     if use_median:
+                        tempstate = tempstate_med
                         setattr(sensors[0], "_state", tempstate_med)
 
                 if device.mean_temperature is not None:
                     tempstate_mean = float(device.mean_temperature)
                     getattr(sensors[0], ATTR)["mean"] = tempstate_mean
                     if not use_median:
+                        tempstate = tempstate_mean
                         setattr(sensors[0], "_state", tempstate_mean)
 
+                if history is not None:
+                    history.record(device.mac, now, tempstate, humstate)
+
+                if exporter is not None:
+                    exporter.add(
+                        device.mac,
+                        device.description,
+                        now,
+                        tempstate,
+                        humstate,
+                        device.battery,
+                        device.rssi,
+                        device.data_size,
+                    )
+
                 for sensor in sensors:
                     last_packet = device.last_packet
                     getattr(sensor, ATTR)["last packet id"] = last_packet
@@ -215,6 +518,17 @@ def setup_platform(hass, config, add_entities, discovery_info=None) -> None:
 
                 device.reset()
 
+        if exporter is not None:
+            # Only full batches, the flush timer sends the rest
+            exporter.flush()
+
+        # Added last so new entities are registered before their first update
+        if discovery is not None:
+            init_discovered_devices()
+
+        if parse_worker is not None:
+            parse_worker.report()
+
     def update_ble_loop(now) -> None:
         """Lookup Bluetooth LE devices and update status."""
         _LOGGER.debug("update_ble_loop called")
@@ -230,15 +544,51 @@ def setup_platform(hass, config, add_entities, discovery_info=None) -> None:
         # update_ble_loop() will be called again after time_offset
         track_point_in_utc_time(hass, update_ble_loop, time_offset)
 
+    def export_flush(now) -> None:
+        """Send every buffered aggregate, full batch or not."""
+        exporter.flush(force=True)
+
+    def stop(event) -> None:
+        """Stop scanning and release resources on Home Assistant stop."""
+        adapter.stop_scanning()
+        if parse_worker is not None:
+            parse_worker.stop()
+        if history is not None:
+            history.close()
+        if exporter is not None:
+            hass.add_job(stop_export_timer)
+            exporter.close()
+
+    def abort_setup() -> None:
+        """Release the adapter and what was built on it after a failed setup."""
+        hci.close_adapter(adapter)
+        if parse_worker is not None:
+            parse_worker.stop()
+        if history is not None:
+            history.close()
+        if exporter is not None:
+            exporter.close()
+
+    def phase_done(phase: str) -> None:
+        """Record the duration of a startup phase."""
+        nonlocal started
+        now = time.perf_counter()
+        timings[phase] = now - started
+        started = now
+
     ###########################################################################
 
-    # Initalize bluetooth adapter and begin scanning
-    # XXX: will not work if there are more than 10 HCI devices
+    # Import bleson and the advertisement parsers off the event loop
+    hci = await hass.async_add_executor_job(
+        importlib.import_module, ".hci", __package__
+    )
+    phase_done("import")
+
+    # Initalize bluetooth adapter
     try:
-        adapter = get_provider().get_adapter(int(config[CONF_HCI_DEVICE][-1]))
-        adapter._handle_meta_event = handle_meta_event
-        hass.bus.listen("homeassistant_stop", adapter.stop_scanning)
-        adapter.start_scanning()
+        adapter = await hass.async_add_executor_job(
+            hci.open_adapter, config[CONF_HCI_DEVICE], handle_meta_event
+        )
     except (RuntimeError, OSError, PermissionError) as error:
         error_msg = "Error connecting to Bluetooth adapter: {}\n\n".format(error)
         error_msg += "Bluetooth adapter troubleshooting:\n"
@@ -249,11 +599,98 @@ def setup_platform(hass, config, add_entities, discovery_info=None) -> None:
         error_msg += "make sure it run with the --privileged flag.\n"
         # _LOGGER.error(error_msg)
         raise HomeAssistantError(error_msg) from error
+    phase_done("adapter")
+
+    try:
+        # Open the downsampled history store
+        if config[CONF_HISTORY]:
+            decimals = DEFAULT_HISTORY_DECIMALS
+            if config[CONF_ROUNDING]:
+                decimals = config[CONF_DECIMALS]
+            history = await hass.async_add_executor_job(
+                HistoryStore, hass.config.path(config[CONF_HISTORY_PATH]), decimals
+            )
+
+        # Buffer aggregates for bulk export
+        if CONF_EXPORT_TARGET in config:
+            exporter = ExportSink(
+                config[CONF_EXPORT_TARGET],
+                config[CONF_EXPORT_FORMAT],
+                config[CONF_EXPORT_BATCH_SIZE],
+                config[CONF_EXPORT_QUEUE_SIZE],
+            )
+
+        # Parse advertising reports off the HCI reader thread
+        if config[CONF_PARSE_WORKER]:
+            frames = FrameQueue(
+                config[CONF_PARSE_QUEUE_SIZE], config[CONF_PARSE_QUEUE_OVERFLOW]
+            )
+            parse_worker = ParseWorker(frames, handle_advertising_report)
+            parse_worker.start()
+
+        # Trace frames from startup
+        if config[CONF_TRACE]:
+            start_tracing(
+                config[CONF_TRACE_MACS],
+                config[CONF_TRACE_SAMPLE],
+                config[CONF_TRACE_SIZE],
+            )
+
+        # Track unconfigured Govee devices
+        if config[CONF_DISCOVERY]:
+            discovery = hci.DiscoveryTracker(
+                config[CONF_DISCOVERY_TABLE_SIZE],
+                config[CONF_DISCOVERY_MIN_SIGHTINGS],
+                config.get(CONF_DISCOVERY_ALLOW),
+                config[CONF_DISCOVERY_DENY],
+            )
+    except Exception:
+        # Do not leave the adapter socket open when setup fails
+        await hass.async_add_executor_job(abort_setup)
+        raise
+    phase_done("pipeline")
+
+    if history is not None:
+        hass.services.async_register(
+            DOMAIN, SERVICE_HISTORY_QUERY, history_query, schema=HISTORY_QUERY_SCHEMA
+        )
+
+    if exporter is not None:
+        # Send partial batches on time, independently of the update period
+        stop_export_timer = async_track_time_interval(
+            hass,
+            export_flush,
+            timedelta(seconds=config[CONF_EXPORT_FLUSH_INTERVAL]),
+        )
+
+    if parse_worker is not None:
+        hass.services.async_register(DOMAIN, SERVICE_PARSE_STATS, parse_stats)
+
+    for service, handler, schema in (
+        (SERVICE_TRACE_START, trace_start, TRACE_START_SCHEMA),
+        (SERVICE_TRACE_STOP, trace_stop, None),
+        (SERVICE_TRACE_DUMP, trace_dump, TRACE_DUMP_SCHEMA),
+    ):
+        hass.services.async_register(DOMAIN, service, handler, schema=schema)
+
+    # Register sensors of configured Govee devices in one batch
+    async_add_entities(init_configureed_devices())
+    phase_done("entities")
+
+    # Begin scanning once every sensor exists
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, stop)
+    await hass.async_add_executor_job(adapter.start_scanning)
+    phase_done("scanning")
+
+    _LOGGER.info(
+        "Govee HCI Sensor started in %.3fs (%s)",
+        sum(timings.values()),
+        ", ".join("{} {:.3f}s".format(k, v) for k, v in timings.items()),
+    )
 
-    # Initialize configured Govee devices
-    init_configureed_devices()
     # Begin sensor update loop
-    update_ble_loop(dt_util.utcnow())
+    time_offset = dt_util.utcnow() + timedelta(seconds=config[CONF_PERIOD])
+    async_track_point_in_utc_time(hass, update_ble_loop, time_offset)
 
 
 ###############################################################################
@@ -378,3 +815,59 @@ class HumiditySensor(RestoreEntity, SensorEntity):
     def force_update(self) -> bool:
         """Force update."""
         return True
+
+
+#
+# HomeAssistant Link Quality Sensor Class
+#
+class LinkQualitySensor(SensorEntity):
+    """Diagnostic sensor of the Bluetooth link to a device."""
+
+    def __init__(self, mac: str, name: str, description: SensorEntityDescription):
+        """Initialize the sensor."""
+        self._state = None
+        self._unique_id = "l_" + mac.replace(":", "")
+        self._name = name
+        self._mac = mac.replace(":", "")
+        self._device_state_attributes = {}
+        self.entity_description = description
+
+    def update_link(self, attributes: Dict[str, Optional[float]]) -> None:
+        """Take the packet reception ratio as state, the rest as attributes."""
+        ratio = attributes.pop("packet reception ratio")
+        self._state = None if ratio is None else round(ratio * 100, 1)
+        self._device_state_attributes = attributes
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return "{} link".format(self._name)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._state
+
+    @property
+    def device_info(self) -> Optional[Dict[str, Collection[Sequence[str]]]]:
+        """Link Quality Device Info."""
+        return {
+            "identifiers": {(DOMAIN, self._mac)},
+            "name": self._name,
+            "manufacturer": "Govee",
+        }
+
+    @property
+    def should_poll(self) -> bool:
+        """No polling needed."""
+        return False
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes."""
+        return self._device_state_attributes
+
+    @property
+    def unique_id(self) -> str:
+        """Return a unique ID."""
+        return self._unique_id
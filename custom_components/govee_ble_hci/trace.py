@@ -0,0 +1,69 @@
+"""Sampled packet tracing into an in-memory ring buffer."""
+from collections import deque
+from typing import Any, Collection, Deque, Dict, List, Optional
+import time
+
+###############################################################################
+
+
+class PacketTracer:
+    """Record decoded advertisements of selected devices.
+
+    The frame handler only consults a tracer when one is active, so tracing
+    costs nothing while disabled. ``wants`` is checked before anything is
+    decoded or formatted for the trace.
+    """
+
+    _addresses: Optional[frozenset]
+    _sample: int
+    _seen: int
+    _entries: Deque[Dict[str, Any]]
+
+    def __init__(
+        self,
+        size: int,
+        addresses: Optional[Collection[bytes]] = None,
+        sample: int = 1,
+    ) -> None:
+        """Init."""
+        self._addresses = frozenset(addresses) if addresses else None
+        self._sample = max(sample, 1)
+        self._seen = 0
+        self._entries = deque(maxlen=max(size, 1))
+
+    def __len__(self) -> int:
+        """Number of recorded entries."""
+        return len(self._entries)
+
+    def wants(self, address: bytes) -> bool:
+        """Return whether a frame of address should be recorded."""
+        if self._addresses is not None and address not in self._addresses:
+            return False
+        self._seen += 1
+        return self._seen % self._sample == 0
+
+    def record(self, data: bytes, advertisement: Any, configured: bool) -> None:
+        """Record the decoded fields of a frame."""
+        self._entries.append(
+            {
+                "time": time.time(),
+                "mac": advertisement.mac,
+                "configured": configured,
+                "rssi": advertisement.rssi,
+                "name": advertisement.name,
+                "model": advertisement.model,
+                "flags": advertisement.flags,
+                "packet": advertisement.packet,
+                "temperature": advertisement.temperature,
+                "humidity": advertisement.humidity,
+                "battery": advertisement.battery,
+                "raw": bytes(data).hex(),
+            }
+        )
+
+    def dump(self, clear: bool = False) -> List[Dict[str, Any]]:
+        """Return recorded entries, oldest first."""
+        entries = list(self._entries)
+        if clear:
+            self._entries.clear()
+        return entries
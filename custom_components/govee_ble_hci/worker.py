@@ -0,0 +1,160 @@
+"""Bounded frame queue and parse worker decoupled from the HCI reader thread."""
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import threading
+
+###############################################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST)
+
+PARSE_BATCH_SIZE = 64
+WORKER_IDLE_TIMEOUT = 1.0
+
+
+class FrameQueue:
+    """Preallocated ring of raw HCI frames.
+
+    ``put`` only moves a reference under a short lock and never waits for
+    room: once full, the overflow policy decides which frame is discarded.
+    """
+
+    _slots: List[Optional[bytes]]
+    _size: int
+    _head: int
+    _count: int
+    _overflow: str
+    _lock: threading.Lock
+    _wakeup: threading.Event
+    _stats: Dict[str, int]
+
+    def __init__(self, size: int, overflow: str = OVERFLOW_DROP_OLDEST) -> None:
+        """Init."""
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unsupported overflow policy: {}".format(overflow))
+        self._size = max(size, 1)
+        self._slots = [None] * self._size
+        self._head = 0
+        self._count = 0
+        self._overflow = overflow
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stats = {"received": 0, "dropped": 0, "high_water": 0}
+
+    def __len__(self) -> int:
+        """Number of queued frames."""
+        return self._count
+
+    @property
+    def wakeup(self) -> threading.Event:
+        """Event set when a frame arrives in an empty queue."""
+        return self._wakeup
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return a copy of the queue counters."""
+        stats = dict(self._stats)
+        stats["backlog"] = self._count
+        return stats
+
+    def put(self, frame: bytes) -> bool:
+        """Queue a frame, return False if a frame had to be dropped."""
+        with self._lock:
+            self._stats["received"] += 1
+            if self._count == self._size:
+                self._stats["dropped"] += 1
+                if self._overflow == OVERFLOW_DROP_NEWEST:
+                    return False
+                # Overwrite the oldest frame
+                self._slots[self._head] = frame
+                self._head = (self._head + 1) % self._size
+                return False
+
+            self._slots[(self._head + self._count) % self._size] = frame
+            self._count += 1
+            if self._count > self._stats["high_water"]:
+                self._stats["high_water"] = self._count
+            was_empty = self._count == 1
+
+        if was_empty:
+            self._wakeup.set()
+        return True
+
+    def get_batch(self, limit: int = PARSE_BATCH_SIZE) -> List[bytes]:
+        """Remove and return up to limit frames, oldest first."""
+        with self._lock:
+            count = min(self._count, limit)
+            batch = []
+            for _ in range(count):
+                batch.append(self._slots[self._head])
+                self._slots[self._head] = None
+                self._head = (self._head + 1) % self._size
+            self._count -= count
+        return batch
+
+
+class ParseWorker(threading.Thread):
+    """Thread draining a FrameQueue in batches through a frame handler."""
+
+    _queue: FrameQueue
+    _handler: Callable[[bytes], None]
+    _running: bool
+    _stats: Dict[str, int]
+    _reported_drops: int
+
+    def __init__(self, queue: FrameQueue, handler: Callable[[bytes], None]) -> None:
+        """Init."""
+        super().__init__(name="govee_ble_hci_parser", daemon=True)
+        self._queue = queue
+        self._handler = handler
+        self._running = True
+        self._stats = {"processed": 0, "batches": 0, "errors": 0}
+        self._reported_drops = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return a copy of the queue and worker counters."""
+        stats = self._queue.stats
+        stats.update(self._stats)
+        return stats
+
+    def run(self) -> None:
+        """Parse queued frames until stopped."""
+        wakeup = self._queue.wakeup
+        while self._running:
+            wakeup.clear()
+            while True:
+                batch = self._queue.get_batch()
+                if not batch:
+                    break
+                for frame in batch:
+                    try:
+                        self._handler(frame)
+                    except Exception:  # pylint: disable=broad-except
+                        self._stats["errors"] += 1
+                        _LOGGER.exception("Error parsing HCI frame")
+                self._stats["processed"] += len(batch)
+                self._stats["batches"] += 1
+            wakeup.wait(WORKER_IDLE_TIMEOUT)
+
+    def stop(self, *args: Any) -> None:
+        """Stop the worker after the current batch."""
+        self._running = False
+        self._queue.wakeup.set()
+        if self.is_alive():
+            self.join(WORKER_IDLE_TIMEOUT)
+
+    def report(self) -> None:
+        """Log the counters, warning when frames were dropped since last time."""
+        stats = self.stats
+        _LOGGER.debug("Parse worker stats: %s", stats)
+        if stats["dropped"] != self._reported_drops:
+            _LOGGER.warning(
+                "Parse queue overflowed, %d of %d frames dropped so far",
+                stats["dropped"],
+                stats["received"],
+            )
+            self._reported_drops = stats["dropped"]
@@ -0,0 +1,69 @@
+"""Tests for the discovery of unconfigured devices."""
+from custom_components.govee_ble_hci.discovery import DiscoveryTracker
+
+GOVEE = bytes.fromhex("a1b2c3d4e5f6")
+H5075_MFG_DATA = bytes.fromhex("88ec0003e9a35a00")
+
+
+def frame(address, mfg_data=None, name=None):
+    """Build an HCI advertising report."""
+    ad = bytes([2, 1, 5])
+    if mfg_data is not None:
+        ad += bytes([len(mfg_data) + 1, 0xFF]) + mfg_data
+    if name is not None:
+        ad += bytes([len(name) + 1, 0x09]) + name.encode()
+    return bytes(3) + address + bytes([len(ad)]) + ad + bytes([0xC0])
+
+
+def foreign(number):
+    """Return the address and a frame of a non Govee device."""
+    address = bytes([number]) * 6
+    return address, frame(address, bytes.fromhex("1234aabbccddeeff"))
+
+
+def test_foreign_flood_does_not_evict_candidates():
+    """Foreign devices outnumbering the table cannot reset a candidate."""
+    tracker = DiscoveryTracker(16, 5)
+    for _ in range(5):
+        for number in range(1, 21):
+            tracker.seen(*foreign(number))
+        tracker.seen(GOVEE, frame(GOVEE, H5075_MFG_DATA))
+
+    assert tracker.pop_ready(5) == [("F6:E5:D4:C3:B2:A1", None, "Govee H5072/H5075")]
+    assert tracker.stats == {"candidates": 0, "foreign": 16, "pending": 0}
+
+
+def test_promoted_once():
+    """A promoted device is not queued again, even after many frames."""
+    tracker = DiscoveryTracker(1, 2)
+    tracker.seen(GOVEE, frame(GOVEE, name="GVH5075_B2A1"))
+    for _ in range(3):
+        tracker.seen(GOVEE, frame(GOVEE, H5075_MFG_DATA))
+    tracker.seen(*foreign(1))
+    tracker.seen(GOVEE, frame(GOVEE, H5075_MFG_DATA))
+
+    assert tracker.pop_ready(5) == [
+        ("F6:E5:D4:C3:B2:A1", "GVH5075_B2A1", "Govee H5072/H5075")
+    ]
+    assert tracker.pop_ready(5) == []
+
+
+def test_govee_layout_without_govee_id_is_ignored():
+    """Frames only matching a Govee layout by length are not counted."""
+    tracker = DiscoveryTracker(16, 1)
+    tracker.seen(GOVEE, frame(GOVEE, bytes.fromhex("12340003e9a35a00")))
+
+    assert tracker.pop_ready(5) == []
+    assert tracker.stats["foreign"] == 1
+
+
+def test_allow_and_deny():
+    """Denied and not allowed addresses are never tracked."""
+    tracker = DiscoveryTracker(16, 1, deny=["F6:E5:D4:C3:B2:A1"])
+    tracker.seen(GOVEE, frame(GOVEE, H5075_MFG_DATA))
+    assert tracker.pop_ready(5) == []
+
+    tracker = DiscoveryTracker(16, 1, allow=["01:01:01:01:01:01"])
+    tracker.seen(GOVEE, frame(GOVEE, H5075_MFG_DATA))
+    assert tracker.pop_ready(5) == []
+    assert tracker.stats["foreign"] == 0
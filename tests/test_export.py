@@ -0,0 +1,86 @@
+"""Tests for the bulk export sink."""
+import socket
+
+import pytest
+
+from custom_components.govee_ble_hci.export import ExportSink
+
+
+@pytest.fixture
+def listener():
+    """Local UDP listener."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1)
+    yield sock
+    sock.close()
+
+
+def receive_lines(sock):
+    """Return every line received until the listener goes quiet."""
+    lines = []
+    while True:
+        try:
+            lines += sock.recv(65535).decode().splitlines()
+        except socket.timeout:
+            return lines
+
+
+def test_udp_batches(listener):
+    """Full batches go out at once, the rest on forced flush."""
+    port = listener.getsockname()[1]
+    sink = ExportSink("udp://127.0.0.1:{}".format(port), "influx", 50, 100)
+    for i in range(120):
+        sink.add("A4:C1:38:00:00:{:02X}".format(i), "Living room", 1.5, 21.5)
+
+    assert sink.stats["dropped"] == 20
+    sink.flush()
+    lines = receive_lines(listener)
+    assert len(lines) == 100
+    assert lines[0] == (
+        "govee,mac=A4:C1:38:00:00:00,name=Living\\ room temperature=21.5 1500000000"
+    )
+
+    sink.add("A4:C1:38:00:00:FF", None, 2.0, humidity=45.0)
+    sink.flush()
+    assert receive_lines(listener) == []
+    sink.close()
+    assert receive_lines(listener) == [
+        "govee,mac=A4:C1:38:00:00:FF humidity=45.0 2000000000"
+    ]
+    assert sink.stats["sent"] == 101
+    assert sink.stats["backlog"] == 0
+
+
+def test_udp_partial_failure_requeues_unsent(listener):
+    """Lines of datagrams sent before an error are not sent again."""
+    port = listener.getsockname()[1]
+    sink = ExportSink("udp://127.0.0.1:{}".format(port), "influx", 100, 100)
+    for i in range(100):
+        sink.add("A4:C1:38:00:00:{:02X}".format(i), "x" * 40, 1.0, 21.5)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    real_sendto = sock.sendto
+    calls = []
+
+    def failing_sendto(payload, address):
+        calls.append(payload)
+        if len(calls) == 2:
+            raise OSError(111, "Connection refused")
+        return real_sendto(payload, address)
+
+    class FailingSocket:
+        sendto = staticmethod(failing_sendto)
+        close = staticmethod(sock.close)
+
+    sink._socket = FailingSocket()
+    sink.flush(force=True)
+    first = receive_lines(listener)
+    assert 0 < len(first) < 100
+    assert sink.stats["errors"] == 1
+    assert sink.stats["backlog"] == 100 - len(first)
+
+    sink.close()
+    rest = receive_lines(listener)
+    assert sorted(first + rest) == sorted(set(first + rest))
+    assert len(first + rest) == 100
@@ -0,0 +1,81 @@
+"""Tests for the downsampled history rings."""
+from custom_components.govee_ble_hci.history import HistoryRing, HistoryStore
+
+MAC = "A4:C1:38:00:00:01"
+
+
+def test_bucket_aggregates(tmp_path):
+    """Readings of one bucket merge into rounded min/mean/max."""
+    ring = HistoryRing(str(tmp_path / "ring"), 60, 4)
+    ring.add(60, 21.1, None)
+    ring.add(90, 21.3, 45.0)
+    ring.add(119, 21.5, None)
+
+    assert ring.buckets(0, 119) == [
+        {
+            "start": 60,
+            "temperature_count": 3,
+            "humidity_count": 1,
+            "temperature_min": 21.1,
+            "temperature_mean": 21.3,
+            "temperature_max": 21.5,
+            "humidity_min": 45.0,
+            "humidity_mean": 45.0,
+            "humidity_max": 45.0,
+        }
+    ]
+    ring.close()
+
+
+def test_ring_wrap_skips_stale_laps(tmp_path):
+    """A slot reused by a later lap only answers for its own bucket."""
+    ring = HistoryRing(str(tmp_path / "ring"), 60, 4)
+    for index in (1, 2, 5):
+        ring.add(index * 60, float(index), None)
+
+    # Bucket 5 took over the slot of bucket 1
+    assert [b["start"] for b in ring.buckets(0, 5 * 60)] == [120, 300]
+
+    # Bucket 2 is still in its slot, but a lap older than the window
+    assert [b["start"] for b in ring.buckets(0, 7 * 60)] == [300]
+    assert ring.buckets(6 * 60, 9 * 60) == []
+    ring.close()
+
+
+def test_reopen_keeps_data_and_resets_incompatible(tmp_path):
+    """A ring file is reused when compatible and reset otherwise."""
+    path = str(tmp_path / "ring")
+    ring = HistoryRing(path, 60, 4)
+    ring.add(60, 20.0, 50.0)
+    ring.close()
+
+    ring = HistoryRing(path, 60, 4)
+    assert len(ring.buckets(0, 60)) == 1
+    ring.close()
+
+    ring = HistoryRing(path, 60, 8)
+    assert ring.buckets(0, 60) == []
+    ring.close()
+
+    ring = HistoryRing(path, 120, 8)
+    assert ring.buckets(0, 120) == []
+    ring.close()
+
+
+def test_query_picks_resolution(tmp_path):
+    """The finest ring covering the window is used unless one is requested."""
+    store = HistoryStore(str(tmp_path))
+    end = 100 * 86400.0
+    store.record(MAC, end, 21.0, 40.0)
+
+    assert store.query(MAC, end - 3600, end)[0] == 60
+    assert store.query(MAC, end - 2 * 86400, end)[0] == 900
+    assert store.query(MAC, end - 30 * 86400, end)[0] == 3600
+    assert store.query(MAC, end - 365 * 86400, end)[0] == 3600
+    assert store.query(MAC, end - 3600, end, 900)[0] == 900
+
+    summary = store.summary(MAC, end - 3600, end)
+    assert summary["temperature_mean"] == 21.0
+    assert summary["humidity_max"] == 40.0
+    assert summary["bucket_count"] == 1
+    store.close()
@@ -0,0 +1,123 @@
+"""Tests for the frame queue and parse worker."""
+import threading
+import time
+
+import pytest
+
+from custom_components.govee_ble_hci.worker import (
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_DROP_OLDEST,
+    WORKER_IDLE_TIMEOUT,
+    FrameQueue,
+    ParseWorker,
+)
+
+
+def frame(number):
+    """Return a distinct raw frame."""
+    return bytes([number])
+
+
+def wait_for(condition, timeout):
+    """Poll condition until it holds or timeout seconds passed."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+@pytest.mark.parametrize(
+    "overflow, kept",
+    [(OVERFLOW_DROP_OLDEST, [3, 4, 5]), (OVERFLOW_DROP_NEWEST, [1, 2, 3])],
+)
+def test_overflow_policy(overflow, kept):
+    """A full queue drops the oldest or the newest frame."""
+    queue = FrameQueue(3, overflow)
+    accepted = [queue.put(frame(n)) for n in range(1, 6)]
+
+    assert accepted == [True, True, True, False, False]
+    assert queue.stats == {
+        "received": 5,
+        "dropped": 2,
+        "high_water": 3,
+        "backlog": 3,
+    }
+    assert queue.get_batch() == [frame(n) for n in kept]
+    assert queue.stats["backlog"] == 0
+
+
+def test_batches_and_wrap():
+    """Frames come out oldest first in bounded batches across the wrap."""
+    queue = FrameQueue(4)
+    for n in range(3):
+        queue.put(frame(n))
+    assert queue.get_batch(2) == [frame(0), frame(1)]
+    for n in range(3, 6):
+        queue.put(frame(n))
+
+    assert len(queue) == 4
+    assert queue.get_batch(10) == [frame(n) for n in range(2, 6)]
+    assert queue.get_batch() == []
+    assert queue.stats["high_water"] == 4
+
+
+def test_wakeup_only_on_empty_queue():
+    """The wakeup event is set by the first frame of an empty queue."""
+    queue = FrameQueue(4)
+    queue.put(frame(0))
+    assert queue.wakeup.is_set()
+    queue.wakeup.clear()
+    queue.put(frame(1))
+    assert not queue.wakeup.is_set()
+
+
+def test_unknown_overflow_policy():
+    """Unsupported overflow policies are rejected."""
+    with pytest.raises(ValueError):
+        FrameQueue(4, "block")
+
+
+def test_worker_drains_without_lost_wakeup():
+    """Frames put one at a time are parsed well before the idle timeout."""
+    queue = FrameQueue(16)
+    parsed = []
+    worker = ParseWorker(queue, parsed.append)
+    worker.start()
+    try:
+        for n in range(50):
+            queue.put(frame(n))
+            assert wait_for(lambda: len(parsed) == n + 1, WORKER_IDLE_TIMEOUT / 2)
+    finally:
+        worker.stop()
+
+    assert parsed == [frame(n) for n in range(50)]
+    assert worker.stats["processed"] == 50
+    assert not worker.is_alive()
+
+
+def test_worker_survives_handler_errors():
+    """A frame raising in the handler is counted and the rest still parsed."""
+    queue = FrameQueue(64)
+    parsed = []
+
+    def handler(data):
+        if data == frame(3):
+            raise ValueError("bad frame")
+        parsed.append(data)
+
+    worker = ParseWorker(queue, handler)
+    producer = threading.Thread(
+        target=lambda: [queue.put(frame(n)) for n in range(10)]
+    )
+    worker.start()
+    producer.start()
+    producer.join()
+    try:
+        assert wait_for(lambda: worker.stats["processed"] == 10, 2)
+    finally:
+        worker.stop()
+
+    assert worker.stats["errors"] == 1
+    assert parsed == [frame(n) for n in range(10) if n != 3]